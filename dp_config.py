@@ -1,43 +1,211 @@
 import time
-from functools import wraps
+import inspect
+from functools import wraps, lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from DrissionPage import ChromiumPage, ChromiumOptions
 from DrissionPage.common import Keys
 import os
 from loguru import logger
-import random
+from random import random as _rand
 import json
-import requests
-import zipfile
-import shutil
+import io
+import threading
+import queue
+
+# requests / zipfile / libarchive 只在下载插件时用到，在函数内按需导入以加快模块加载
 
 # 自定义日志格式
-logger.add("logfile.log", format="{time:YYYY-MM-DD at HH:mm:ss} | {level} | {message}")
+# enqueue 使日志在后台线程写入，按大小轮转并压缩旧日志
+logger.add("logfile.log", format="{time:YYYY-MM-DD at HH:mm:ss} | {level} | {message}",
+           enqueue=True, rotation="10 MB", compression="zip", backtrace=False, diagnose=False)
 
-# 插件下载地址配置
+# 插件下载地址配置；值也可以是按优先级排列的地址列表，前一个失败或超时后尝试下一个
 PLUGIN_URLS = {
     "cloudflare_ua_patch": "https://github.com/gua12345/DrissionPage_Base_Code/releases/download/v1/cloudflare_ua_patch.zip",
     "my-fingerprint-chrome": "https://github.com/gua12345/DrissionPage_Base_Code/releases/download/v1/my-fingerprint-chrome-v2.5.1.zip",
     "turnstilePatch": "https://github.com/gua12345/DrissionPage_Base_Code/releases/download/v1/turnstilePatch.zip"
 }
 
-def check_and_download_plugin(plugin_name):
+def _plugin_urls(plugin_name):
+    # 统一为地址列表
+    urls = PLUGIN_URLS[plugin_name]
+    return [urls] if isinstance(urls, str) else list(urls)
+
+# 询问是否下载插件时接受的回答
+_YES = frozenset({'y', 'yes', '是'})
+_NO = frozenset({'n', 'no', '否'})
+
+# 插件下载时每次读取的块大小(字节)
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# 插件下载超时时间(连接, 读取)(秒)
+DOWNLOAD_TIMEOUT = (5, 30)
+
+# 插件更新检查超时时间(连接, 读取)(秒)，检查失败不影响使用本地插件，不宜过长
+UPDATE_CHECK_TIMEOUT = (2, 3)
+
+# 插件更新检查间隔(秒)，间隔内不再联网检查
+UPDATE_CHECK_INTERVAL = 24 * 60 * 60
+
+# 复用连接的会话，多个插件共享同一 TLS 连接池，首次使用时创建；按重试次数区分
+_SESSIONS = {}
+_SESSION_LOCK = threading.Lock()
+
+def _get_session(retries=3):
+    with _SESSION_LOCK:
+        session = _SESSIONS.get(retries)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=4,
+                max_retries=Retry(total=retries, backoff_factor=0.5) if retries else 0,
+            ))
+            _SESSIONS[retries] = session
+    return session
+
+@lru_cache(maxsize=None)
+def _load_libarchive():
+    # 可选依赖：libarchive 解压大插件比 zipfile 更快，未安装时回退到 zipfile
+    try:
+        import libarchive
+    except ImportError:
+        return None
+    except (OSError, AttributeError, TypeError) as e:
+        # 已安装 libarchive-c 但系统缺少 libarchive 动态库时，ctypes 加载会抛出这些异常
+        logger.warning(f"加载 libarchive 失败，使用 zipfile 解压: {e}")
+        return None
+    return libarchive
+
+# 插件版本清单文件，记录每个插件的下载地址、ETag 与上次检查更新的时间
+PLUGIN_MANIFEST = ".plugins_manifest.json"
+_MANIFEST_LOCK = threading.Lock()
+
+def _load_manifest():
+    try:
+        with open(os.path.join(os.getcwd(), PLUGIN_MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _update_manifest(plugin_name, **fields):
+    # 多个插件可能并发下载，读改写需加锁；清单只用于加速，写入失败（如目录或文件无写权限）不影响插件使用
+    with _MANIFEST_LOCK:
+        manifest = _load_manifest()
+        manifest.setdefault(plugin_name, {}).update(fields)
+        try:
+            with open(os.path.join(os.getcwd(), PLUGIN_MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.warning(f"写入插件清单 {PLUGIN_MANIFEST} 失败: {e}")
+
+def _update_check_due(plugin_name):
+    # 清单中有 ETag 且距上次检查已超过 UPDATE_CHECK_INTERVAL 时才需要联网检查更新，需要时返回清单记录
+    entry = _load_manifest().get(plugin_name, {})
+    if not entry.get("etag") or plugin_name not in PLUGIN_URLS:
+        return None
+    if time.time() - entry.get("checked_at", 0) < UPDATE_CHECK_INTERVAL:
+        return None
+    return entry
+
+def plugin_up_to_date(plugin_name):
     """
-    检查插件是否存在，如果不存在则询问用户是否下载
+    通过 If-None-Match 条件请求检查本地插件是否为最新版本
 
     Args:
         plugin_name (str): 插件名称
 
     Returns:
-        bool: 插件是否可用（存在或下载成功）
+        bool: 插件是否为最新（清单中无记录、距上次检查未超过 UPDATE_CHECK_INTERVAL 或检查失败时视为最新）
     """
-    plugin_path = os.path.join(os.getcwd(), plugin_name)
+    entry = _update_check_due(plugin_name)
+    if entry is None:
+        return True
+    etag = entry["etag"]
+    # 无论检查结果如何都记录时间，离线环境下也不会每次启动都等待超时
+    _update_manifest(plugin_name, checked_at=time.time())
+    # 不同下载地址的 ETag 可能不同，使用下载时的地址检查
+    url = entry.get("url") or _plugin_urls(plugin_name)[0]
 
-    # 检查插件是否存在
-    if os.path.exists(plugin_path):
-        logger.info(f"插件 {plugin_name} 已存在")
+    import requests
+    try:
+        # 更新检查只发一次请求，不重试
+        response = _get_session(retries=0).head(url, headers={'If-None-Match': etag},
+                                                allow_redirects=True, timeout=UPDATE_CHECK_TIMEOUT)
+    except requests.RequestException as e:
+        logger.warning(f"检查插件 {plugin_name} 更新失败: {e}")
         return True
 
-    # 插件不存在，询问用户是否下载
+    if response.status_code == 304 or response.headers.get('ETag') == etag:
+        return True
+    if not response.ok:
+        logger.warning(f"检查插件 {plugin_name} 更新失败: HTTP {response.status_code}")
+        return True
+
+    logger.info(f"插件 {plugin_name} 有新版本")
+    return False
+
+def update_plugin(plugin_name):
+    """
+    已存在的插件如有新版本则重新下载
+
+    Args:
+        plugin_name (str): 插件名称
+
+    Returns:
+        bool: 插件是否可用（更新失败时本地版本保持不变，仍可使用）
+    """
+    if plugin_up_to_date(plugin_name) or download_plugin(plugin_name):
+        return True
+    logger.warning(f"插件 {plugin_name} 更新失败，继续使用本地版本")
+    return plugin_exists(plugin_name)
+
+def plugin_exists(plugin_name):
+    """
+    检查插件文件夹是否存在
+
+    Args:
+        plugin_name (str): 插件名称
+
+    Returns:
+        bool: 插件是否存在
+    """
+    return _plugin_installed(os.path.join(os.getcwd(), plugin_name))
+
+@lru_cache(maxsize=None)
+def _plugin_installed(plugin_path):
+    # 缓存检查结果，避免每次创建浏览器都重复 stat，下载插件后需调用 cache_clear
+    return os.path.exists(plugin_path)
+
+def _find_first_existing(paths):
+    """
+    按顺序返回第一个存在的路径（失效的符号链接视为不存在）
+
+    Args:
+        paths (list): 候选路径列表
+
+    Returns:
+        str | None: 第一个存在的路径，均不存在时返回 None
+    """
+    for path in paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+def ask_download_plugin(plugin_name):
+    """
+    插件不存在时询问用户是否下载
+
+    Args:
+        plugin_name (str): 插件名称
+
+    Returns:
+        bool: 用户是否同意下载
+    """
     logger.warning(f"插件 {plugin_name} 不存在")
 
     if plugin_name not in PLUGIN_URLS:
@@ -47,113 +215,400 @@ def check_and_download_plugin(plugin_name):
     # 询问用户是否下载
     while True:
         user_input = input(f"插件 {plugin_name} 不存在，是否自动下载？(y/n): ").strip().lower()
-        if user_input in ['y', 'yes', '是']:
-            return download_plugin(plugin_name)
-        elif user_input in ['n', 'no', '否']:
+        if user_input in _YES:
+            return True
+        elif user_input in _NO:
             logger.info(f"用户选择不下载插件 {plugin_name}")
             return False
         else:
             print("请输入 y/yes/是 或 n/no/否")
 
-def download_plugin(plugin_name):
+def _plugin_task(plugin_name):
     """
-    下载并解压插件
+    检查插件是否存在，如果不存在则询问用户是否下载，返回后续需要执行的任务
 
     Args:
         plugin_name (str): 插件名称
 
     Returns:
-        bool: 下载是否成功
+        callable | bool: 需要联网时返回任务（检查更新为 update_plugin，同意下载为 download_plugin），
+            否则直接返回插件是否可用
+    """
+    # 检查插件是否存在
+    if plugin_exists(plugin_name):
+        logger.info(f"插件 {plugin_name} 已存在")
+        return update_plugin if _update_check_due(plugin_name) is not None else True
+
+    # 插件不存在，询问用户是否下载
+    if ask_download_plugin(plugin_name):
+        return download_plugin
+    return False
+
+def check_and_download_plugin(plugin_name):
     """
+    检查插件是否存在，如果不存在则询问用户是否下载
+
+    Args:
+        plugin_name (str): 插件名称
+
+    Returns:
+        bool: 插件是否可用（存在或下载成功）
+    """
+    task = _plugin_task(plugin_name)
+    return task(plugin_name) if callable(task) else task
+
+def _read_response(response, chunk_size):
+    """
+    将响应内容读入内存
+
+    Args:
+        response (requests.Response): 以 stream=True 发起的响应
+        chunk_size (int): 每次读取的块大小(字节)
+
+    Returns:
+        bytes | bytearray: 响应内容
+    """
+    import requests
+
+    total = int(response.headers.get('Content-Length') or 0)
+    if not total or response.headers.get('Content-Encoding'):
+        # 长度未知或内容经过压缩编码时，按块拼接
+        return b"".join(response.iter_content(chunk_size=chunk_size))
+
+    # 长度已知时预分配缓冲区，直接读入，避免每块创建 bytes 对象
+    buf = bytearray(total)
+    view = memoryview(buf)
+    offset = 0
+    while offset < total:
+        n = response.raw.readinto(view[offset:offset + chunk_size])
+        if not n:
+            raise requests.RequestException(f"下载内容不完整: {offset}/{total} 字节")
+        offset += n
+    return buf
+
+def _extract_archive(data, dest):
+    """
+    将内存中的 zip 内容解压到指定目录
+
+    Args:
+        data (bytes | bytearray): zip 文件内容
+        dest (str): 解压目录
+    """
+    import zipfile
+
+    with zipfile.ZipFile(io.BytesIO(data), 'r') as zip_ref:
+        zip_ref.extractall(dest)
+
+class _QueueReader(io.RawIOBase):
+    """从队列读取下载线程写入的数据块，块为 None 表示数据结束"""
+
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = chunks
+        self._pending = memoryview(b"")
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._pending and not self._eof:
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._eof = True
+            else:
+                self._pending = memoryview(chunk)
+        n = min(len(b), len(self._pending))
+        # libarchive 传入的是 ctypes 字符数组，按字节视图整体拷贝，避免逐字节赋值
+        memoryview(b).cast('B')[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+def _stream_extract(response, chunk_size, dest):
+    """
+    边下载边解压到指定目录（需要 libarchive，zipfile 无法读取不可 seek 的流）
+
+    Args:
+        response (requests.Response): 以 stream=True 发起的响应
+        chunk_size (int): 每次读取的块大小(字节)
+        dest (str): 解压目录
+    """
+    libarchive = _load_libarchive()
+    from libarchive.extract import (
+        extract_entries, EXTRACT_SECURE_NODOTDOT, EXTRACT_SECURE_SYMLINKS, EXTRACT_SECURE_NOABSOLUTEPATHS,
+    )
+    # 与 zipfile.extractall 一致，拒绝 ..、绝对路径和经由符号链接写出目标目录的条目
+    flags = EXTRACT_SECURE_NODOTDOT | EXTRACT_SECURE_SYMLINKS | EXTRACT_SECURE_NOABSOLUTEPATHS
+
+    chunks = queue.Queue()
+    errors = []
+
+    def produce():
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                chunks.put(chunk)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            chunks.put(None)
+
+    root = os.path.abspath(dest)
+
+    def relocate(archive):
+        # libarchive 按条目路径解压到当前目录，加上目标目录前缀；绝对路径、跳出目标目录的条目和硬链接一律拒绝
+        for entry in archive:
+            path = entry.pathname
+            target = os.path.abspath(os.path.join(root, path))
+            if os.path.isabs(path) or os.path.commonpath([root, target]) != root or entry.islnk:
+                raise libarchive.ArchiveError(f"压缩包包含不安全的条目: {path}")
+            # 临时目录位于当前目录下，转换为相对路径后不含 .. 且不是绝对路径
+            entry.pathname = os.path.relpath(target)
+            yield entry
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
     try:
-        url = PLUGIN_URLS[plugin_name]
-        logger.info(f"开始下载插件 {plugin_name} 从 {url}")
+        with libarchive.stream_reader(_QueueReader(chunks), block_size=chunk_size) as archive:
+            extract_entries(relocate(archive), flags=flags)
+    except Exception:
+        # 解压失败时关闭连接让下载线程退出；下载本身出错时优先抛出下载错误
+        response.close()
+        producer.join()
+        if errors:
+            raise errors[0]
+        raise
+    producer.join()
+    if errors:
+        raise errors[0]
+
+def _archive_errors():
+    # 两种解压方式可能抛出的压缩包错误
+    import zipfile
+
+    libarchive = _load_libarchive()
+    if libarchive is not None:
+        return zipfile.BadZipFile, libarchive.ArchiveError
+    return zipfile.BadZipFile,
+
+def _install_from(plugin_name, url, session, chunk_size):
+    """
+    从指定地址下载插件并安装到插件目录
+
+    Args:
+        plugin_name (str): 插件名称
+        url (str): 下载地址
+        session (requests.Session): 下载使用的会话
+        chunk_size (int): 下载时每次读取的块大小(字节)
 
-        # 下载文件
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+    Returns:
+        bool: 是否安装成功（下载或解压出错时抛出异常）
+    """
+    import shutil
+    import tempfile
 
-        zip_filename = f"{plugin_name}.zip"
+    libarchive = _load_libarchive()
+    logger.info(f"开始下载插件 {plugin_name} 从 {url}")
 
-        # 保存zip文件
-        with open(zip_filename, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+    # 下载文件
+    response = session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
 
-        logger.info(f"插件 {plugin_name} 下载完成")
+    etag = response.headers.get('ETag')
 
-        # 解压文件
-        with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
-            zip_ref.extractall('.')
+    # 先解压到临时目录，全部成功后再移动到插件目录，避免中断时留下不完整的插件
+    tmp_dir = tempfile.mkdtemp(dir='.')
+    try:
+        if libarchive is not None:
+            # 下载与解压并行进行
+            _stream_extract(response, chunk_size, tmp_dir)
+            logger.info(f"插件 {plugin_name} 下载完成")
+        else:
+            # 直接在内存中缓存zip内容，避免写入临时文件
+            buf = _read_response(response, chunk_size)
+            logger.info(f"插件 {plugin_name} 下载完成")
 
-        # 删除zip文件
-        os.remove(zip_filename)
+            # 解压文件
+            _extract_archive(buf, tmp_dir)
 
         # 验证解压后的文件夹是否存在
-        plugin_path = os.path.join(os.getcwd(), plugin_name)
-        if os.path.exists(plugin_path):
-            logger.info(f"插件 {plugin_name} 安装成功")
-            return True
-        else:
+        extracted = os.path.join(tmp_dir, plugin_name)
+        if not os.path.isdir(extracted):
             logger.error(f"插件 {plugin_name} 解压后未找到对应文件夹")
             return False
 
-    except requests.RequestException as e:
-        logger.error(f"下载插件 {plugin_name} 失败: {e}")
-        return False
-    except zipfile.BadZipFile as e:
-        logger.error(f"解压插件 {plugin_name} 失败: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"安装插件 {plugin_name} 时发生未知错误: {e}")
-        return False
+        plugin_path = os.path.join(os.getcwd(), plugin_name)
+        backup = None
+        if os.path.exists(plugin_path):
+            # 旧版本先整体移入临时目录，替换失败时恢复；新版本已删除的文件随临时目录一起清理
+            backup = os.path.join(tmp_dir, plugin_name + ".old")
+            os.replace(plugin_path, backup)
+        try:
+            os.replace(extracted, plugin_path)
+        except OSError:
+            if backup:
+                os.replace(backup, plugin_path)
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        _plugin_installed.cache_clear()
+
+    _update_manifest(plugin_name, url=url, etag=etag, checked_at=time.time())
+    logger.info(f"插件 {plugin_name} 安装成功")
+    return True
+
+def download_plugin(plugin_name, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    下载并解压插件，按顺序尝试 PLUGIN_URLS 中的地址
+
+    Args:
+        plugin_name (str): 插件名称
+        chunk_size (int, optional): 下载时每次读取的块大小(字节). Defaults to DOWNLOAD_CHUNK_SIZE.
+
+    Returns:
+        bool: 下载是否成功
+    """
+    import requests
 
+    if plugin_name not in PLUGIN_URLS:
+        logger.error(f"未找到插件 {plugin_name} 的下载地址")
+        return False
+    urls = _plugin_urls(plugin_name)
+    for index, url in enumerate(urls):
+        # 还有备用地址时不在同一地址上重试，尽快切换
+        session = _get_session(retries=3 if index == len(urls) - 1 else 0)
+        try:
+            if _install_from(plugin_name, url, session, chunk_size):
+                return True
+        except requests.RequestException as e:
+            logger.error(f"下载插件 {plugin_name} 失败: {e}")
+        except _archive_errors() as e:
+            logger.error(f"解压插件 {plugin_name} 失败: {e}")
+        except Exception as e:
+            logger.error(f"安装插件 {plugin_name} 时发生未知错误: {e}")
+    return False
+
+
+def _format_call(func, args, kwargs):
+    # 格式化参数
+    args_repr = [repr(a) for a in args]
+    kwargs_repr = [f"{k}={v!r}" for k, v in kwargs.items()]
+    signature = ", ".join(args_repr + kwargs_repr)
+    return f"{func.__name__}({signature})"
 
 def retry_on_exception(retries=3, delay=2, backoff=1, jitter=0.1):
     """
-    通用重试装饰器
+    通用重试装饰器，支持普通函数和协程函数（协程使用 asyncio.sleep 等待，不阻塞事件循环）
     Args:
         retries (int): 最大重试次数
         delay (int): 基础延迟时间(秒)
         backoff (float): 退避系数(每次重试后延迟时间乘以这个系数)
         jitter (float): 随机抖动范围(0-1之间，为了防止同时重试)
     """
+    # 重试次数固定，预先计算每次重试的基础延迟
+    delays = [delay * (backoff ** attempt) for attempt in range(retries - 1)]
 
     def decorator(func):
+        _sleep = time.sleep
+
+        def on_failure(attempt, e, func_call_str):
+            # 记录失败日志，返回需要等待的时间；最后一次失败返回 None
+            if attempt < retries - 1:  # 如果不是最后一次尝试
+                sleep_time = delays[attempt]
+                # 添加随机抖动
+                if jitter:
+                    sleep_time *= 1.0 + jitter * _rand()
+                logger.warning(f"函数 {func_call_str} 第 {attempt + 1} 次执行失败: {str(e)}")
+                logger.info(f"等待 {sleep_time:.2f} 秒后重试...")
+                return sleep_time
+            logger.error(f"函数 {func_call_str} 重试耗尽，最后错误: {str(e)}")
+            return None
+
+        def exhausted(last_exception, args, kwargs):
+            if last_exception:
+                return last_exception
+            return RuntimeError(f"函数 {_format_call(func, args, kwargs)} 重试耗尽，但未捕获到异常")
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                last_exception = None
+                # 参数格式化仅在首次失败时进行，成功调用不产生 repr 开销
+                func_call_str = None
+
+                for attempt in range(retries):
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        last_exception = e
+                        if func_call_str is None:
+                            func_call_str = _format_call(func, args, kwargs)
+                        sleep_time = on_failure(attempt, e, func_call_str)
+                        if sleep_time is not None:
+                            # 仅协程重试时才需要 asyncio，避免同步使用场景承担其导入开销
+                            import asyncio
+                            await asyncio.sleep(sleep_time)
+                raise exhausted(last_exception, args, kwargs)
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             last_exception = None
-            # 格式化参数
-            args_repr = [repr(a) for a in args]
-            kwargs_repr = [f"{k}={v!r}" for k, v in kwargs.items()]
-            signature = ", ".join(args_repr + kwargs_repr)
-            func_call_str = f"{func.__name__}({signature})"
+            # 参数格式化仅在首次失败时进行，成功调用不产生 repr 开销
+            func_call_str = None
 
             for attempt in range(retries):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
                     last_exception = e
-                    if attempt < retries - 1:  # 如果不是最后一次尝试
-                        # 计算延迟时间
-                        sleep_time = delay * (backoff ** attempt)
-                        # 添加随机抖动
-                        if jitter:
-                            sleep_time += random.uniform(0, jitter * sleep_time)
-                        logger.warning(f"函数 {func_call_str} 第 {attempt + 1} 次执行失败: {str(e)}")
-                        logger.info(f"等待 {sleep_time:.2f} 秒后重试...")
-                        time.sleep(sleep_time)
-                    else:
-                        logger.error(f"函数 {func_call_str} 重试耗尽，最后错误: {str(e)}")
-            if last_exception:
-                raise last_exception
-            else:
-                raise RuntimeError(f"函数 {func_call_str} 重试耗尽，但未捕获到异常")
+                    if func_call_str is None:
+                        func_call_str = _format_call(func, args, kwargs)
+                    sleep_time = on_failure(attempt, e, func_call_str)
+                    if sleep_time is not None:
+                        _sleep(sleep_time)
+            raise exhausted(last_exception, args, kwargs)
 
         return wrapper
 
     return decorator
 
+# 系统判断
+_IS_WINDOWS = os.name == 'nt'
+
+# 浏览器默认路径
+WINDOWS_BROWSER_PATHS = [
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
+]
+
+LINUX_BROWSER_PATHS = [
+    '/usr/bin/google-chrome',  # Chrome默认路径
+    '/usr/bin/chromium',  # Chromium默认路径
+    '/usr/bin/chromium-browser',  # Ubuntu Chromium默认路径
+    '/usr/bin/microsoft-edge',  # Edge默认路径
+    '/snap/bin/chromium',  # Snap安装的Chromium路径
+    '/usr/lib/chromium/chromium',  # 某些发行版的Chromium路径
+    '/usr/lib/chromium-browser/chromium-browser'
+]
+
+@lru_cache(maxsize=None)
+def _is_admin():
+    # 权限检测；进程运行期间权限不会改变，首次创建浏览器时检测一次即可
+    if _IS_WINDOWS:
+        import ctypes
+        return bool(ctypes.windll.shell32.IsUserAnAdmin())
+    try:
+        return os.geteuid() == 0
+    except AttributeError:
+        return False
+
+@lru_cache(maxsize=None)
+def _default_browser_path():
+    # 根据系统选择搜索路径，结果在进程内缓存
+    return _find_first_existing(WINDOWS_BROWSER_PATHS if _IS_WINDOWS else LINUX_BROWSER_PATHS)
+
 class GuaPage(ChromiumPage):
     def __init__(self, options=None):
         super().__init__(options)
@@ -174,12 +629,12 @@ class GuaPage(ChromiumPage):
         if element is None:
             ele = self.ele(selector, timeout=timeout)
             ele.click()
-            logger.info(f"成功点击元素: {selector}")
+            logger.info("成功点击元素: {}", selector)
             return True
         else:
             ele = element
             ele.click()
-            logger.info(f"成功点击元素: {selector}")
+            logger.info("成功点击元素: {}", selector)
             return True
 
     @retry_on_exception(retries=3, delay=3)
@@ -200,13 +655,13 @@ class GuaPage(ChromiumPage):
             ele = self.ele(selector, timeout=timeout)
             ele.clear()
             ele.input(text)
-            logger.info(f"成功输入文本到元素: {selector}")
+            logger.info("成功输入文本到元素: {}", selector)
             return True
         else:
             ele = element
             ele.clear()
             ele.input(text)
-            logger.info(f"成功输入文本到元素: {selector}")
+            logger.info("成功输入文本到元素: {}", selector)
             return True
 
     @retry_on_exception(retries=5, delay=3)
@@ -227,13 +682,13 @@ class GuaPage(ChromiumPage):
             ele = self.ele(selector, timeout=timeout)
             self.actions.click(ele)
             self.actions.input(text)
-            logger.info(f"成功通过动作链输入文本到元素: {selector}")
+            logger.info("成功通过动作链输入文本到元素: {}", selector)
             return True
         else:
             ele = element
             self.actions.click(ele)
             self.actions.input(text)
-            logger.info(f"成功通过动作链输入文本到元素 {selector}")
+            logger.info("成功通过动作链输入文本到元素 {}", selector)
             return True
 
     @retry_on_exception(retries=5, delay=3)
@@ -252,74 +707,71 @@ class GuaPage(ChromiumPage):
         if element is None:
             ele = self.ele(selector, timeout=timeout)
             self.actions.click(ele)
-            logger.info(f"成功通过动作链点击元素: {selector}")
+            logger.info("成功通过动作链点击元素: {}", selector)
             return True
         else:
             ele = element
             self.actions.click(ele)
-            logger.info(f"成功通过动作链点击元素: {selector}")
+            logger.info("成功通过动作链点击元素: {}", selector)
             return True
 
-def set_driver(headless=False, browser_path=None, user_agent=None, proxy=None, cf_bypass=True, random_fingerprint=True, ua_patch=True):
-    # 系统判断
-    is_windows = os.name == 'nt'
-
-    # 浏览器默认路径
-    windows_paths = [
-        r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-        r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-        r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
-    ]
-
-    linux_paths = [
-        '/usr/bin/google-chrome',  # Chrome默认路径
-        '/usr/bin/chromium',  # Chromium默认路径
-        '/usr/bin/chromium-browser',  # Ubuntu Chromium默认路径
-        '/usr/bin/microsoft-edge',  # Edge默认路径
-        '/snap/bin/chromium',  # Snap安装的Chromium路径
-        '/usr/lib/chromium/chromium',  # 某些发行版的Chromium路径
-        '/usr/lib/chromium-browser/chromium-browser'
-    ]
-
-    # 根据系统选择搜索路径
-    default_paths = windows_paths if is_windows else linux_paths
+@lru_cache(maxsize=None)
+def _base_arguments():
+    """
+    生成与调用参数无关的固定启动参数和首选项，进程内只生成一次
 
+    Returns:
+        tuple: (启动参数, 首选项键值对)
+    """
+    arguments = []
+    if _is_admin():
+        # 管理员/root环境下的必要设置
+        arguments += ['--no-sandbox', '--disable-dev-shm-usage']
+        if not _IS_WINDOWS:
+            arguments += ['--disable-gpu', '--disable-software-rasterizer']  # Linux环境可能需要
+
+    # 通用设置
+    arguments.append('--hide-crash-restore-bubble')
+    # 设置浏览器语言为英语
+    arguments.append('--lang=en-US')  # 设置浏览器界面语言
+    arguments.append('--accept-languages=en-US,en')  # 设置HTTP请求头语言偏好
+
+    prefs = (
+        ('profile.default_content_settings.popups', '0'),
+        ('credentials_enable_service', False),
+    )
+    return tuple(arguments), prefs
+
+def _apply_arguments(co, arguments, prefs):
+    """
+    批量写入启动参数和首选项
+
+    Args:
+        co (ChromiumOptions): 浏览器配置
+        arguments (tuple): 启动参数
+        prefs (tuple): 首选项键值对
+    """
+    existing = getattr(co, '_arguments', None)
+    if isinstance(existing, list) and isinstance(getattr(co, '_prefs', None), dict):
+        # 直接修改底层列表/字典，跳过已存在的参数，与 set_argument 的去重效果一致
+        existing.extend(arg for arg in arguments if arg not in existing)
+        co._prefs.update(prefs)
+    else:
+        for arg in arguments:
+            co.set_argument(arg)
+        for key, value in prefs:
+            co.set_pref(key, value)
+
+def set_driver(headless=False, browser_path=None, user_agent=None, proxy=None, cf_bypass=True, random_fingerprint=True, ua_patch=True):
     # 如果未指定路径，则自动检测
     if not browser_path:
-        for path in default_paths:
-            if os.path.exists(path):
-                browser_path = path
-                break
+        browser_path = _default_browser_path()
         if not browser_path:
             raise FileNotFoundError("未找到可用的浏览器，请手动指定browser_path参数")
 
     co = ChromiumOptions().set_paths(browser_path=browser_path)
+    _apply_arguments(co, *_base_arguments())
 
-    # 权限检测
-    if is_windows:
-        import ctypes
-        is_admin = ctypes.windll.shell32.IsUserAnAdmin()
-    else:
-        try:
-            is_admin = os.geteuid() == 0
-        except AttributeError:
-            is_admin = False
-
-    if is_admin:
-        # 管理员/root环境下的必要设置
-        co.set_argument('--no-sandbox')
-        co.set_argument('--disable-dev-shm-usage')
-        if not is_windows:
-            co.set_argument('--disable-gpu')  # Linux环境可能需要
-            co.set_argument('--disable-software-rasterizer')
-
-    # 通用设置
-    co.set_pref(arg='profile.default_content_settings.popups', value='0')
-    co.set_pref('credentials_enable_service', False)
-    co.set_argument('--hide-crash-restore-bubble')
-    # 设置浏览器语言为英语
-    co.set_argument('--lang=en-US')  # 设置浏览器界面语言
-    co.set_argument('--accept-languages=en-US,en')  # 设置HTTP请求头语言偏好
     if proxy:
         co.set_proxy(proxy)
     co.headless(headless)
@@ -333,26 +785,35 @@ def set_driver(headless=False, browser_path=None, user_agent=None, proxy=None, c
     co.new_env()
 
     # 检查并加载插件
-    if cf_bypass:
-        if check_and_download_plugin("turnstilePatch"):
-            co.add_extension(r"turnstilePatch")
+    plugins = [name for enabled, name in (
+        (cf_bypass, "turnstilePatch"),
+        (random_fingerprint, "my-fingerprint-chrome"),
+        (ua_patch, "cloudflare_ua_patch"),
+    ) if enabled]
+
+    # 先依次询问用户（input 不能并发），只有需要联网检查更新/下载的插件才并发执行
+    available = {}
+    tasks = {}
+    for name in plugins:
+        task = _plugin_task(name)
+        if callable(task):
+            tasks[name] = task
         else:
-            logger.warning("turnstilePatch 插件不可用，跳过加载")
+            available[name] = task
 
-    if random_fingerprint:
-        if check_and_download_plugin("my-fingerprint-chrome"):
-            co.add_extension(r"my-fingerprint-chrome")
-        else:
-            logger.warning("my-fingerprint-chrome 插件不可用，跳过加载")
+    if tasks:
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {name: executor.submit(task, name) for name, task in tasks.items()}
+            available.update((name, future.result()) for name, future in futures.items())
 
-    if ua_patch:
-        if check_and_download_plugin("cloudflare_ua_patch"):
-            co.add_extension(r"cloudflare_ua_patch")
+    for name in plugins:
+        if available[name]:
+            co.add_extension(name)
         else:
-            logger.warning("cloudflare_ua_patch 插件不可用，跳过加载")
+            logger.warning(f"{name} 插件不可用，跳过加载")
 
     # 检查并加载 gpt_rf 插件（如果存在）
-    if os.path.exists("gpt_rf"):
+    if plugin_exists("gpt_rf"):
         co.add_extension("gpt_rf")
 
     driver = GuaPage(co)